@@ -1,37 +1,53 @@
-use criterion::{Criterion, criterion_group, criterion_main};
+use criterion::{BatchSize, Criterion, criterion_group, criterion_main};
 use std::sync::mpsc;
-use std::thread;
-use std::time::Duration;
 
-use _mhtk_rs::stub_device;
-use _mhtk_rs::tttr_record;
+use tdc_toolkit::multiharp::mhlib_wrapper::meta::TTREADMAX;
+use tdc_toolkit::multiharp::tttr_record::T2RecordChannelProcessor;
 
-fn process_measurements() {
-    let (raw_tx_channel, raw_rx_channel) = mpsc::channel();
-    let (processed_tx_channel, processed_rx_channel) = mpsc::channel();
+const BATCH_COUNT: usize = 8;
 
-    let device_handle = thread::spawn(|| {
-        let device = stub_device::StubMultiharpDevice {};
-        device.stream_measurement(&Duration::from_millis(1000), raw_tx_channel);
-    });
+/// Full-sized FIFO reads of normal records on channel 1, each ending in an overflow record.
+fn generate_raw_batches() -> Vec<Vec<u32>> {
+    let records_per_batch = u32::try_from(TTREADMAX).unwrap();
+    let raw_batch: Vec<u32> = (0..records_per_batch - 1)
+        .map(|event_time| 0x0200_0001 + event_time)
+        .chain([0xFE00_0001])
+        .collect();
+    vec![raw_batch; BATCH_COUNT]
+}
 
-    let processor_handle = thread::spawn(|| {
-        let mut processor = tttr_record::T2RecordChannelProcessor::new();
-        processor.process(raw_rx_channel, processed_tx_channel);
-    });
+fn process_raw_batches(raw_receive_channel: mpsc::Receiver<Vec<u32>>) -> u64 {
+    let (processed_send_channel, processed_receive_channel) = mpsc::channel();
+    let mut processor = T2RecordChannelProcessor::new();
+    processor
+        .process(raw_receive_channel, processed_send_channel)
+        .unwrap();
 
     let mut total_messages = 0u64;
-    for processed_messages in processed_rx_channel {
-        total_messages += processed_messages.len() as u64;
+    for processed_batch in processed_receive_channel {
+        total_messages += processed_batch.len() as u64;
     }
-    println!("{}", total_messages);
-
-    device_handle.join().unwrap();
-    processor_handle.join().unwrap();
+    total_messages
 }
 
 pub fn criterion_benchmark(c: &mut Criterion) {
-    c.bench_function("raw_stream", |b| b.iter(|| process_measurements()));
+    // Decode a fixed amount of pre-generated input on every iteration,
+    // so that the measurement does not depend on how quickly a
+    // producer can fill an unbounded channel.
+    let raw_batches = generate_raw_batches();
+    c.bench_function("raw_stream", |b| {
+        b.iter_batched(
+            || {
+                let (raw_send_channel, raw_receive_channel) = mpsc::channel();
+                for raw_batch in &raw_batches {
+                    raw_send_channel.send(raw_batch.clone()).unwrap();
+                }
+                raw_receive_channel
+            },
+            process_raw_batches,
+            BatchSize::PerIteration,
+        );
+    });
 }
 
 criterion_group! {
@@ -50,7 +50,7 @@ enum Command {
     ///
     /// Regardless of the input device, all output files contain the following fields:
     ///
-    /// * `channel`: The device channel associated with the event. [`arrow::datatypes::DataType::UInt16`]
+    /// * `channel`: The device channel associated with the event. Channel 0 is the sync channel; input channels are numbered from 1. [`arrow::datatypes::DataType::UInt16`]
     ///
     /// * `time_tag`: The monotonic timestamp associated with the event, in picoseconds. [`arrow::datatypes::DataType::UInt64`]
     Record {
@@ -23,12 +23,23 @@ use serde::{Deserialize, Serialize};
 use std::collections::{HashMap, HashSet};
 use std::fmt::{Display, Formatter};
 use std::sync::mpsc;
+use std::thread;
 use std::time::Duration;
 
 use super::mhlib_wrapper::meta::event_filter::{
     Inverse, MATCHCNTMIN, MainEnabled, RowEnabled, TIMERANGEMIN, TestMode,
 };
-use super::mhlib_wrapper::meta::{CHANNELS_PER_ROW, Edge, Features, MhlibWrapper, Mode, RefSource};
+use super::mhlib_wrapper::meta::{
+    CHANNELS_PER_ROW, Edge, Features, MhlibWrapper, Mode, RefSource, TTREADMAX,
+};
+
+/// Shortest wait before polling the device FIFO again after a read that returned no records.
+///
+/// The wait doubles on every consecutive empty read, up to [`FIFO_POLL_INTERVAL_MAX`], and is dropped entirely as soon as a read returns records. This keeps the measurement loop from spinning on `MH_GetFlags`/`MH_ReadFiFo` while the device is idle, without delaying reads while events are arriving.
+const FIFO_POLL_INTERVAL_MIN: Duration = Duration::from_micros(100);
+
+/// Longest wait before polling the device FIFO again after a read that returned no records. This is kept short relative to the time needed to fill the device FIFO, so that a burst of events arriving after an idle period cannot cause an overrun.
+const FIFO_POLL_INTERVAL_MAX: Duration = Duration::from_millis(10);
 
 /// MultiHarp 160 device configuration.
 ///
@@ -388,6 +399,12 @@ impl<T: MhlibWrapper> MH160Device<T> {
         measurement_time: &Duration,
         tx_channel: &mpsc::Sender<Vec<u32>>,
     ) -> Result<()> {
+        // Empty reads, which are frequent while the device is idle, reuse
+        // the same TTREADMAX-sized buffer. A buffer holding records is
+        // sent on as-is and replaced with a fresh one, so records are
+        // never copied here.
+        let mut fifo_buffer: Vec<u32> = Vec::with_capacity(TTREADMAX);
+        let mut poll_interval = Duration::ZERO;
         self.mhlib_wrapper
             .start_measurement(measurement_time.as_millis().try_into()?)?;
         loop {
@@ -396,12 +413,20 @@ impl<T: MhlibWrapper> MH160Device<T> {
                 // FLAG_FIFOFULL
                 bail!("FLAG_FIFOFULL seen, FIFO overrun. Stopping measurement.");
             }
-            let records = self.mhlib_wrapper.read_fifo()?;
-            if !records.is_empty() {
-                tx_channel.send(records)?;
+            self.mhlib_wrapper.read_fifo(&mut fifo_buffer)?;
+            if !fifo_buffer.is_empty() {
+                tx_channel.send(std::mem::replace(
+                    &mut fifo_buffer,
+                    Vec::with_capacity(TTREADMAX),
+                ))?;
+                poll_interval = Duration::ZERO;
             } else if self.mhlib_wrapper.ctc_status()? != 0 {
                 // measurement completed
                 break;
+            } else {
+                poll_interval =
+                    (poll_interval * 2).clamp(FIFO_POLL_INTERVAL_MIN, FIFO_POLL_INTERVAL_MAX);
+                thread::sleep(poll_interval);
             }
         }
         // measurement is stopped in higher-level function
@@ -629,8 +654,50 @@ fn row_filter_row_mask(global_1_channels: &[MH160ChannelIdNoSync], rowidx: i32)
 #[cfg(test)]
 mod tests {
     use super::*;
+    use crate::multiharp::mhlib_wrapper::stub::MhlibWrapperStub;
+    use std::time::Instant;
     use yare::parameterized;
 
+    #[test]
+    fn test_stream_measurement_backs_off_while_fifo_is_idle() {
+        let measurement_time = Duration::from_millis(200);
+        // Eight empty reads, enough to back the poll interval off to its
+        // maximum, then records, one more empty read, and more records.
+        let mut fifo_reads = vec![Vec::new(); 8];
+        fifo_reads.push(vec![1]);
+        fifo_reads.push(Vec::new());
+        fifo_reads.push(vec![2]);
+        let device =
+            MH160Device::from_current_config(MhlibWrapperStub::with_fifo_reads(0, fifo_reads))
+                .unwrap();
+
+        let (send_channel, receive_channel) = mpsc::channel();
+        let start_time = Instant::now();
+        device
+            .do_stream_measurement(&measurement_time, &send_channel)
+            .unwrap();
+        // Idle reads alone do not end the loop; only a completed
+        // measurement does.
+        assert!(start_time.elapsed() >= measurement_time);
+        drop(send_channel);
+        assert_eq!(
+            receive_channel.iter().collect::<Vec<_>>(),
+            vec![vec![1], vec![2]]
+        );
+
+        let read_gaps: Vec<Duration> = device
+            .mhlib_wrapper
+            .fifo_read_times()
+            .windows(2)
+            .map(|read_times| read_times[1] - read_times[0])
+            .collect();
+        // The wait before the first records arrive has reached the maximum...
+        assert!(read_gaps[7] >= FIFO_POLL_INTERVAL_MAX);
+        // ...and reading those records reset it, so the following empty
+        // read is retried after the minimum wait.
+        assert!(read_gaps[9] < FIFO_POLL_INTERVAL_MAX);
+    }
+
     #[parameterized(
         nothing_row0 = { &Vec::new(), 0, 0 },
         nothing_row3 = { &Vec::new(), 3, 0 },
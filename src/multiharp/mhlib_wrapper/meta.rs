@@ -171,7 +171,8 @@ pub trait MhlibWrapper: Send + Sync {
     fn get_warnings(&self) -> Result<String>;
     fn initialize(&self, mode: Mode, ref_source: RefSource) -> Result<()>;
     fn open_device(&self) -> Result<String>;
-    fn read_fifo(&self) -> Result<Vec<u32>>;
+    /// Replace the contents of `record_buffer` with the records currently waiting in the device FIFO. The buffer is intended to be reused across calls, so that its allocation (up to [`TTREADMAX`] records) is made only once per measurement.
+    fn read_fifo(&self, record_buffer: &mut Vec<u32>) -> Result<()>;
     fn set_binning(&self, binning: i32) -> Result<()>;
     fn set_histogram_length(&self, len_code: i32) -> Result<i32>;
     fn set_input_channel_enable(&self, channel: MH160InternalChannelId, enable: bool)
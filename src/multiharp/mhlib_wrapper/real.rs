@@ -520,12 +520,14 @@ impl MhlibWrapper for MhlibWrapperReal {
         }
     }
 
-    fn read_fifo(&self) -> Result<Vec<u32>> {
+    fn read_fifo(&self, record_buffer: &mut Vec<u32>) -> Result<()> {
         let mut num_records: i32 = 0;
-        // TODO there should be a way to use Vec's spare_capacity_mut here
-        // to avoid initialization overhead, but we would need to change
-        // the C method signature to accept a MaybeUninit.
-        let mut record_buffer: Vec<u32> = vec![0u32; meta::TTREADMAX];
+        // MH_ReadFiFo may write up to TTREADMAX records. The reserved
+        // capacity is left uninitialized; this is sound because only
+        // the records that MH_ReadFiFo reports as written are exposed
+        // through set_len.
+        record_buffer.clear();
+        record_buffer.reserve(meta::TTREADMAX);
         unsafe {
             let ret = MH_ReadFiFo(
                 self.device_index.into(),
@@ -534,8 +536,8 @@ impl MhlibWrapper for MhlibWrapperReal {
             );
             handle_error(ret)?;
             record_buffer.set_len(num_records.try_into()?);
-            Ok(record_buffer)
         }
+        Ok(())
     }
 
     fn set_row_event_filter(
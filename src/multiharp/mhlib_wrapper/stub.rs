@@ -1,4 +1,5 @@
 use anyhow::Result;
+use std::collections::VecDeque;
 use std::sync::Mutex;
 use std::thread;
 use std::time::{Duration, Instant};
@@ -16,6 +17,8 @@ use super::meta::{
 pub struct MhlibWrapperStub {
     device_index: u8,
     measurement_end: Mutex<Option<Instant>>,
+    scripted_fifo_reads: Option<Mutex<VecDeque<Vec<u32>>>>,
+    fifo_read_times: Mutex<Vec<Instant>>,
 }
 
 impl MhlibWrapperStub {
@@ -24,9 +27,30 @@ impl MhlibWrapperStub {
         Self {
             device_index,
             measurement_end: Mutex::new(None),
+            scripted_fifo_reads: None,
+            fifo_read_times: Mutex::new(Vec::new()),
         }
     }
 
+    /// Create a stub whose `read_fifo` returns each of `fifo_reads` in turn, without delay, while the measurement is running, and returns no records after that. An empty read simulates a FIFO that is idle in the middle of a measurement. The time of each of these reads is recorded; see [`Self::fifo_read_times`].
+    #[must_use]
+    pub fn with_fifo_reads(device_index: u8, fifo_reads: Vec<Vec<u32>>) -> Self {
+        Self {
+            scripted_fifo_reads: Some(Mutex::new(fifo_reads.into())),
+            ..Self::new(device_index)
+        }
+    }
+
+    /// The times at which `read_fifo` was called during a measurement. Only recorded for stubs created with [`Self::with_fifo_reads`].
+    ///
+    /// # Panics
+    ///
+    /// Panics if a thread panicked while reading from the FIFO.
+    #[must_use]
+    pub fn fifo_read_times(&self) -> Vec<Instant> {
+        self.fifo_read_times.lock().unwrap().clone()
+    }
+
     fn measurement_is_complete(&self) -> bool {
         self.measurement_end
             .lock()
@@ -241,14 +265,22 @@ impl MhlibWrapper for MhlibWrapperStub {
         Ok("warning".to_string())
     }
 
-    /// Returns one stub record while the measurement is active, then an empty buffer once it completes.
-    fn read_fifo(&self) -> Result<Vec<u32>> {
+    /// Fills the buffer with one stub record every 100 ms while the measurement is active, or with the next scripted read if the stub was created with [`MhlibWrapperStub::with_fifo_reads`]. Leaves it empty once the measurement completes.
+    fn read_fifo(&self, record_buffer: &mut Vec<u32>) -> Result<()> {
+        record_buffer.clear();
         if self.measurement_is_complete() {
-            Ok(vec![])
+            return Ok(());
+        }
+        if let Some(scripted_fifo_reads) = &self.scripted_fifo_reads {
+            self.fifo_read_times.lock().unwrap().push(Instant::now());
+            if let Some(fifo_read) = scripted_fifo_reads.lock().unwrap().pop_front() {
+                record_buffer.extend_from_slice(&fifo_read);
+            }
         } else {
             thread::sleep(Duration::from_millis(100));
-            Ok(vec![0u32])
+            record_buffer.push(0u32);
         }
+        Ok(())
     }
 
     fn set_row_event_filter(
@@ -307,3 +339,22 @@ impl MhlibWrapper for MhlibWrapperStub {
         })
     }
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn test_read_fifo_replaces_buffer_contents() {
+        let wrapper = MhlibWrapperStub::new(0);
+        let mut record_buffer = vec![1u32, 2, 3];
+
+        wrapper.read_fifo(&mut record_buffer).unwrap();
+        assert!(record_buffer.is_empty());
+
+        record_buffer.extend([1u32, 2, 3]);
+        wrapper.start_measurement(1_000).unwrap();
+        wrapper.read_fifo(&mut record_buffer).unwrap();
+        assert_eq!(record_buffer, vec![0u32]);
+    }
+}
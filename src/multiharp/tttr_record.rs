@@ -1,31 +1,23 @@
-use crate::types::NormalizedTimeTag;
+use crate::types::{NormalizedTimeTag, NormalizedTimeTagBatch};
 
 use anyhow::Result;
 use std::sync::mpsc;
 
-// A tuple representing a single T2 record.
-//
-// The first int is the channel ID. Channel 0 is the sync channel: raw
-// records sent with the "special" bit set indicating that they contain
-// a sync timetag are translated to channel 0 here. To add to the
-// confusion, "normal" channels are represented in the raw records
-// starting from 0; they are shifted by 1 here, so channel 0 in the raw
-// record becomes channel 1 here. Given that the MultiHarp has no more
-// than 64 channels, an 8-bit unsigned int should be sufficient to
-// represent this value.
-//
-// The second int is the time tag, in picoseconds. A 64-bit unsigned
-// int should be sufficient for experiments of up to a few months in
-// length. Note that the raw value is not in picoseconds; it has been
-// converted here.
-//
-// A tuple is used to avoid performance penalties that would be caused
-// by creating a new object for each record.
-fn split_raw_t2_record(raw_record: u32) -> (u8, u16, u64) {
+/// Split a raw MultiHarp T2 record into its three fields: the special
+/// flag (0 or 1), the channel, and the time tag.
+///
+/// The values are returned exactly as stored in the record. For normal
+/// records the channel counts from 0, and the time tag is in device
+/// time-tag units, not picoseconds, with no overflow correction.
+/// [`T2RecordChannelProcessor`] converts them into
+/// [`NormalizedTimeTag`] values.
+#[inline]
+#[must_use]
+pub const fn split_raw_t2_record(raw_record: u32) -> (u8, u16, u64) {
     let special = ((raw_record >> 31) & 0x01) as u8; // highest bit
     let channel = ((raw_record >> 25) & 0x3F) as u16; // next six bits
     let time_tag = raw_record & 0x01FF_FFFF; // the rest
-    (special, channel, u64::from(time_tag))
+    (special, channel, time_tag as u64)
 }
 
 pub struct T2RecordChannelProcessor {
@@ -50,87 +42,110 @@ impl T2RecordChannelProcessor {
     pub fn process(
         &mut self,
         rx_channel: mpsc::Receiver<Vec<u32>>,
-        mut tx_channel: mpsc::Sender<Vec<NormalizedTimeTag>>,
+        mut tx_channel: mpsc::Sender<NormalizedTimeTagBatch>,
     ) -> Result<()> {
         for raw_records in rx_channel {
-            self.process_raw_records(raw_records, &mut tx_channel)?;
+            self.process_raw_records(&raw_records, &mut tx_channel)?;
         }
         Ok(())
     }
 
     fn process_raw_records(
         &mut self,
-        raw_records: Vec<u32>,
-        tx_channel: &mut mpsc::Sender<Vec<NormalizedTimeTag>>,
+        raw_records: &[u32],
+        tx_channel: &mut mpsc::Sender<NormalizedTimeTagBatch>,
     ) -> Result<()> {
         // Channels have very limited throughput, about 20 million
         // messages a second if Kanal's benchmarks are accurate. Batch
-        // messages together in a vector to avoid this overhead.
+        // messages together to avoid this overhead. The batch is
+        // column-oriented so that the output stage can copy each
+        // column in one go.
         //
-        // For simplicity's sake, make the vector's capacity the same
+        // For simplicity's sake, make the batch's capacity the same
         // as the input vector's size, although in reality it may be
         // somewhat smaller. We may have to tune this to reduce
         // latency in the future.
         //
         // https://docs.rs/kanal/latest/kanal/index.html
-        let mut tx_vec: Vec<NormalizedTimeTag> = Vec::with_capacity(raw_records.len());
-        for raw_record in raw_records {
-            let (special, channel, time_tag) = split_raw_t2_record(raw_record);
-            if !self.process_special_records(special, channel, time_tag, &mut tx_vec) {
-                self.process_normal_record(channel, time_tag, &mut tx_vec);
-            }
+        let mut tx_batch = NormalizedTimeTagBatch::with_capacity(raw_records.len());
+
+        // Special records (overflows, syncs and markers) are rare
+        // compared to normal records, and only overflows change the
+        // state of the processor. Split the input into runs of normal
+        // records separated by single special records, so that each
+        // run can be decoded by a branch-free loop that the compiler
+        // is able to vectorize.
+        let mut remaining_records = raw_records;
+        loop {
+            let normal_run_length = remaining_records
+                .iter()
+                .position(|&raw_record| split_raw_t2_record(raw_record).0 == 1)
+                .unwrap_or(remaining_records.len());
+            let (normal_records, rest) = remaining_records.split_at(normal_run_length);
+            self.process_normal_records(normal_records, &mut tx_batch);
+
+            let Some((&special_record, rest)) = rest.split_first() else {
+                break;
+            };
+            let (_, channel, time_tag) = split_raw_t2_record(special_record);
+            self.process_special_record(channel, time_tag, &mut tx_batch);
+            remaining_records = rest;
+        }
+
+        // Input made up only of overflows and markers produces no
+        // events; there is no need to wake the writer for it.
+        if !tx_batch.is_empty() {
+            tx_channel.send(tx_batch)?;
         }
-        tx_channel.send(tx_vec)?;
         Ok(())
     }
 
-    fn process_special_records(
+    fn process_special_record(
         &mut self,
-        special: u8,
         channel: u16,
         time_tag: u64,
-        tx_vec: &mut Vec<NormalizedTimeTag>,
-    ) -> bool {
-        if special != 1 {
-            return false;
-        }
+        tx_batch: &mut NormalizedTimeTagBatch,
+    ) {
         if channel == 0x3F {
-            // Overflow
-            if time_tag == 0 {
-                // old style overflow, shouldn't happen
-                self.overflow_correction += self.t2wraparound_v2;
-            } else {
-                self.overflow_correction += self.t2wraparound_v2 * time_tag;
-            }
-            return true;
+            // Overflow. The time tag holds the number of wraparounds
+            // since the last overflow record. An old-style overflow
+            // record, which shouldn't happen, has a time tag of 0 and
+            // stands for a single wraparound.
+            self.overflow_correction += self.t2wraparound_v2 * time_tag.max(1);
+            return;
         }
         if channel == 0 {
             // Sync channel
             let true_time = self.overflow_correction + time_tag;
-            tx_vec.push(NormalizedTimeTag {
+            tx_batch.push(NormalizedTimeTag {
                 channel_id: 0u16,
                 time_tag_ps: (true_time * self.resolution),
             });
-            return true;
         }
         // TODO Currently, this code discards external marker special records.
         //
         // Specifically, a channel between 1 and 15 inclusive indicates an external
         // marker; see the MultiHarp manual.
-        true
     }
 
-    fn process_normal_record(
-        &self,
-        channel: u16,
-        time_tag: u64,
-        tx_vec: &mut Vec<NormalizedTimeTag>,
-    ) {
-        let true_time = self.overflow_correction + time_tag;
-        tx_vec.push(NormalizedTimeTag {
-            channel_id: (channel + 1),
-            time_tag_ps: (true_time * self.resolution),
-        });
+    /// All of `raw_records` must be normal (non-special) records.
+    fn process_normal_records(&self, raw_records: &[u32], tx_batch: &mut NormalizedTimeTagBatch) {
+        // The correction is constant within a run of normal records,
+        // so convert it to picoseconds once rather than per record.
+        let resolution = self.resolution;
+        let overflow_correction_ps = self.overflow_correction * resolution;
+        tx_batch
+            .channel_ids
+            .extend(raw_records.iter().map(|&raw_record| {
+                let (_, channel, _) = split_raw_t2_record(raw_record);
+                channel + 1
+            }));
+        tx_batch
+            .time_tags_ps
+            .extend(raw_records.iter().map(|&raw_record| {
+                let (_, _, time_tag) = split_raw_t2_record(raw_record);
+                overflow_correction_ps + time_tag * resolution
+            }));
     }
 }
 
@@ -139,3 +154,109 @@ impl Default for T2RecordChannelProcessor {
         Self::new()
     }
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use yare::parameterized;
+
+    fn process_batches(raw_batches: Vec<Vec<u32>>) -> Vec<NormalizedTimeTagBatch> {
+        let (raw_send_channel, raw_receive_channel) = mpsc::channel();
+        let (processed_send_channel, processed_receive_channel) = mpsc::channel();
+        for raw_batch in raw_batches {
+            raw_send_channel.send(raw_batch).unwrap();
+        }
+        drop(raw_send_channel);
+        T2RecordChannelProcessor::new()
+            .process(raw_receive_channel, processed_send_channel)
+            .unwrap();
+        processed_receive_channel.iter().collect()
+    }
+
+    #[parameterized(
+        normal = { 0x0400_0003, (0, 2, 3) },
+        overflow = { 0xFE00_0002, (1, 0x3F, 2) },
+        sync_max_time_tag = { 0x81FF_FFFF, (1, 0, 0x01FF_FFFF) },
+    )]
+    fn test_split_raw_t2_record(raw_record: u32, expected: (u8, u16, u64)) {
+        assert_eq!(split_raw_t2_record(raw_record), expected);
+    }
+
+    #[test]
+    fn test_normal_and_sync_records() {
+        let batches = process_batches(vec![vec![
+            0x0000_0001, // channel 1, time tag 1
+            0x8000_000A, // sync, time tag 10
+            0x0400_0003, // channel 3, time tag 3
+        ]]);
+        assert_eq!(
+            batches,
+            vec![NormalizedTimeTagBatch {
+                channel_ids: vec![1, 0, 3],
+                time_tags_ps: vec![5, 50, 15],
+            }]
+        );
+    }
+
+    #[test]
+    fn test_overflow_correction_persists_across_batches() {
+        let batches = process_batches(vec![
+            vec![
+                0xFE00_0002, // overflow, two wraparounds
+                0x0000_0001, // channel 1, time tag 1
+            ],
+            vec![
+                0xFE00_0000, // old-style overflow, one wraparound
+                0x8000_0001, // sync, time tag 1
+            ],
+        ]);
+        assert_eq!(
+            batches,
+            vec![
+                NormalizedTimeTagBatch {
+                    channel_ids: vec![1],
+                    time_tags_ps: vec![(2 * 33_554_432 + 1) * 5],
+                },
+                NormalizedTimeTagBatch {
+                    channel_ids: vec![0],
+                    time_tags_ps: vec![(3 * 33_554_432 + 1) * 5],
+                },
+            ]
+        );
+    }
+
+    #[test]
+    fn test_batches_without_events_are_not_sent() {
+        let batches = process_batches(vec![
+            vec![
+                0xFE00_0001, // overflow, one wraparound
+                0x8200_0005, // external marker 1
+            ],
+            vec![
+                0x0000_0001, // channel 1, time tag 1
+            ],
+        ]);
+        assert_eq!(
+            batches,
+            vec![NormalizedTimeTagBatch {
+                channel_ids: vec![1],
+                time_tags_ps: vec![(33_554_432 + 1) * 5],
+            }]
+        );
+    }
+
+    #[test]
+    fn test_external_markers_are_discarded() {
+        let batches = process_batches(vec![vec![
+            0x8200_0005, // external marker 1
+            0x0200_0007, // channel 2, time tag 7
+        ]]);
+        assert_eq!(
+            batches,
+            vec![NormalizedTimeTagBatch {
+                channel_ids: vec![2],
+                time_tags_ps: vec![35],
+            }]
+        );
+    }
+}
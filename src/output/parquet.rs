@@ -4,15 +4,20 @@ use arrow::datatypes::{DataType, Field, Schema};
 use arrow::record_batch::RecordBatch;
 use chrono::Utc;
 use parquet::arrow::ArrowWriter;
+use parquet::basic::{Compression, Encoding, ZstdLevel};
+use parquet::file::properties::WriterProperties;
+use parquet::schema::types::ColumnPath;
 use std::fs::File;
 use std::path::Path;
 use std::sync::{Arc, mpsc};
 
-use crate::types::NormalizedTimeTag;
+use crate::types::NormalizedTimeTagBatch;
 
 /// Write a series of Parquet files to disk containing the data from the input queue.
 ///
 /// For write efficiency and ease in handling large volumes of data, we batch writes to Parquet files in chunks of about 200 MiB (as recommended in [this discussion](https://github.com/apache/arrow/issues/13142)), and then rotate to a new file approximately every 2 GiB. Rows are assumed to contain about 80 bits of data each; ignoring metadata overhead and compression, this means that a 2 GiB file can hold approximately 214,700,000 rows. For simplicity, we set the default size limit for each file to 200,000,000 rows, and default chunk size to 20,000,000.
+///
+/// Files are compressed with Zstandard. The `channel` column, which only ever holds a handful of distinct values, is dictionary-encoded; the `time_tag` column, which increases steadily over the course of a measurement, is delta-encoded instead.
 pub struct TimeTagStreamParquetWriter {
     // The maximum number of total rows (records) that should be
     // collected before writing to disk.
@@ -33,7 +38,7 @@ impl TimeTagStreamParquetWriter {
 
     pub fn write(
         &self,
-        rx_channel: mpsc::Receiver<Vec<NormalizedTimeTag>>,
+        rx_channel: mpsc::Receiver<NormalizedTimeTagBatch>,
         output_dir: &Path,
         name: &str,
     ) -> Result<()> {
@@ -49,6 +54,8 @@ impl TimeTagStreamParquetWriter {
         ];
         let schema: Arc<Schema> = Schema::new(fields).into();
 
+        let writer_properties = self.writer_properties()?;
+
         let max_chunk_count = self.max_file_rows / self.max_chunk_rows;
         let file_timestamp = Utc::now().format("%Y%m%dT%H%M%SZ");
 
@@ -56,29 +63,32 @@ impl TimeTagStreamParquetWriter {
         let initial_file = File::create_new(
             output_dir.join(format!("{file_timestamp}_{name}_{total_files:0>4}.parquet")),
         )?;
-        let mut arrow_writer = ArrowWriter::try_new(initial_file, schema.clone(), None)?;
-        let mut channel_array_builder = UInt16Array::builder(self.max_chunk_rows);
-        let mut time_tag_array_builder = UInt64Array::builder(self.max_chunk_rows);
-        let mut array_length = 0;
+        let mut arrow_writer = ArrowWriter::try_new(
+            initial_file,
+            schema.clone(),
+            Some(writer_properties.clone()),
+        )?;
+        let mut channel_ids: Vec<u16> = Vec::with_capacity(self.max_chunk_rows);
+        let mut time_tags_ps: Vec<u64> = Vec::with_capacity(self.max_chunk_rows);
         let mut chunk_count = 0;
         for rx_batch in rx_channel {
-            for event in rx_batch {
-                array_length += 1;
-                channel_array_builder.append_value(event.channel_id);
-                time_tag_array_builder.append_value(event.time_tag_ps);
-            }
-
-            if array_length >= self.max_chunk_rows {
+            // Write out the current chunk before the incoming batch would
+            // take it past max_chunk_rows, rather than after. Appending
+            // first would make the vectors outgrow their preallocated
+            // capacity, copying the whole chunk into a new allocation of
+            // twice the size. Incoming batches hold at most one FIFO
+            // read's worth of records, far fewer than max_chunk_rows.
+            if !channel_ids.is_empty() && channel_ids.len() + rx_batch.len() > self.max_chunk_rows {
                 // write current batch into current file
-                let batch = RecordBatch::try_new(
-                    schema.clone(),
-                    vec![
-                        Arc::new(channel_array_builder.finish()),
-                        Arc::new(time_tag_array_builder.finish()),
-                    ],
+                let batch = Self::record_batch(
+                    &schema,
+                    std::mem::replace(&mut channel_ids, Vec::with_capacity(self.max_chunk_rows)),
+                    std::mem::replace(&mut time_tags_ps, Vec::with_capacity(self.max_chunk_rows)),
                 )?;
                 arrow_writer.write(&batch)?;
-                array_length = 0;
+                // ArrowWriter would otherwise hold this chunk back and
+                // top it up with rows from the next one.
+                arrow_writer.flush()?;
                 chunk_count += 1;
             }
 
@@ -91,25 +101,61 @@ impl TimeTagStreamParquetWriter {
                 let new_file = File::create_new(
                     output_dir.join(format!("{file_timestamp}_{name}_{total_files:0>4}.parquet")),
                 )?;
-                arrow_writer = ArrowWriter::try_new(new_file, schema.clone(), None)?;
+                arrow_writer = ArrowWriter::try_new(
+                    new_file,
+                    schema.clone(),
+                    Some(writer_properties.clone()),
+                )?;
             }
+
+            channel_ids.extend_from_slice(&rx_batch.channel_ids);
+            time_tags_ps.extend_from_slice(&rx_batch.time_tags_ps);
         }
 
         // write any remaining data
-        if array_length > 0 {
-            let batch = RecordBatch::try_new(
-                schema.clone(),
-                vec![
-                    Arc::new(channel_array_builder.finish()),
-                    Arc::new(time_tag_array_builder.finish()),
-                ],
-            )?;
+        if !channel_ids.is_empty() {
+            let batch = Self::record_batch(&schema, channel_ids, time_tags_ps)?;
             arrow_writer.write(&batch)?;
         }
         arrow_writer.close()?;
 
         Ok(())
     }
+
+    fn writer_properties(&self) -> Result<WriterProperties> {
+        // Dictionary encoding is enabled for all columns by default,
+        // which suits `channel`. Every `time_tag` value is distinct, so
+        // a dictionary would only be built and then abandoned; the
+        // small, regular differences between consecutive values are
+        // what compresses well.
+        //
+        // The row group limit matches our chunk size, so that a chunk is
+        // not split up by the default limit of about one million rows.
+        // Together with the flush after each chunk in `write`, this
+        // makes every chunk exactly one row group.
+        let time_tag_column = ColumnPath::from("time_tag");
+        Ok(WriterProperties::builder()
+            .set_compression(Compression::ZSTD(ZstdLevel::try_new(3)?))
+            .set_column_dictionary_enabled(time_tag_column.clone(), false)
+            .set_column_encoding(time_tag_column, Encoding::DELTA_BINARY_PACKED)
+            .set_max_row_group_size(self.max_chunk_rows)
+            .build())
+    }
+
+    /// Wrap the accumulated columns in a record batch. Arrow takes ownership of each vector's allocation as-is, so no data is copied here.
+    fn record_batch(
+        schema: &Arc<Schema>,
+        channel_ids: Vec<u16>,
+        time_tags_ps: Vec<u64>,
+    ) -> Result<RecordBatch> {
+        Ok(RecordBatch::try_new(
+            schema.clone(),
+            vec![
+                Arc::new(UInt16Array::from(channel_ids)),
+                Arc::new(UInt64Array::from(time_tags_ps)),
+            ],
+        )?)
+    }
 }
 
 impl Default for TimeTagStreamParquetWriter {
@@ -117,3 +163,136 @@ impl Default for TimeTagStreamParquetWriter {
         Self::new()
     }
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::types::NormalizedTimeTag;
+    use arrow::array::Array;
+    use parquet::arrow::arrow_reader::ParquetRecordBatchReaderBuilder;
+    use std::fs;
+    use std::path::PathBuf;
+
+    fn write_batches(
+        writer: &TimeTagStreamParquetWriter,
+        batches: Vec<NormalizedTimeTagBatch>,
+    ) -> (tempfile::TempDir, Vec<PathBuf>) {
+        let output_dir = tempfile::tempdir().unwrap();
+        let (send_channel, receive_channel) = mpsc::channel();
+        for batch in batches {
+            send_channel.send(batch).unwrap();
+        }
+        drop(send_channel);
+        writer
+            .write(receive_channel, output_dir.path(), "test")
+            .unwrap();
+        let mut output_files: Vec<PathBuf> = fs::read_dir(output_dir.path())
+            .unwrap()
+            .map(|entry| entry.unwrap().path())
+            .collect();
+        output_files.sort();
+        (output_dir, output_files)
+    }
+
+    fn test_batch(first_time_tag_ps: u64, len: u16) -> NormalizedTimeTagBatch {
+        let mut batch = NormalizedTimeTagBatch::default();
+        for i in 0..len {
+            batch.push(NormalizedTimeTag {
+                channel_id: i % 3,
+                time_tag_ps: first_time_tag_ps + u64::from(i) * 5,
+            });
+        }
+        batch
+    }
+
+    #[test]
+    fn test_round_trip_and_encodings() {
+        let writer = TimeTagStreamParquetWriter {
+            max_chunk_rows: 1_000,
+            max_file_rows: 10_000,
+        };
+        let batches = vec![
+            test_batch(0, 300),
+            test_batch(10_000, 500),
+            test_batch(20_000, 400),
+        ];
+        let mut expected = NormalizedTimeTagBatch::default();
+        for batch in &batches {
+            expected.channel_ids.extend_from_slice(&batch.channel_ids);
+            expected.time_tags_ps.extend_from_slice(&batch.time_tags_ps);
+        }
+        let (_output_dir, output_files) = write_batches(&writer, batches);
+        assert_eq!(output_files.len(), 1);
+
+        let reader_builder =
+            ParquetRecordBatchReaderBuilder::try_new(File::open(&output_files[0]).unwrap())
+                .unwrap();
+        for row_group in reader_builder.metadata().row_groups() {
+            let channel_column = row_group.column(0);
+            let time_tag_column = row_group.column(1);
+            assert!(matches!(channel_column.compression(), Compression::ZSTD(_)));
+            assert!(matches!(
+                time_tag_column.compression(),
+                Compression::ZSTD(_)
+            ));
+            assert!(channel_column.dictionary_page_offset().is_some());
+            assert!(time_tag_column.dictionary_page_offset().is_none());
+            assert!(
+                time_tag_column
+                    .encodings()
+                    .contains(&Encoding::DELTA_BINARY_PACKED)
+            );
+        }
+
+        let mut actual = NormalizedTimeTagBatch::default();
+        for record_batch in reader_builder.build().unwrap() {
+            let record_batch = record_batch.unwrap();
+            actual.channel_ids.extend_from_slice(
+                record_batch
+                    .column(0)
+                    .as_any()
+                    .downcast_ref::<UInt16Array>()
+                    .unwrap()
+                    .values(),
+            );
+            actual.time_tags_ps.extend_from_slice(
+                record_batch
+                    .column(1)
+                    .as_any()
+                    .downcast_ref::<UInt64Array>()
+                    .unwrap()
+                    .values(),
+            );
+        }
+        assert_eq!(actual, expected);
+    }
+
+    #[test]
+    fn test_each_chunk_is_one_row_group() {
+        let writer = TimeTagStreamParquetWriter {
+            max_chunk_rows: 4,
+            max_file_rows: 100,
+        };
+        let (_output_dir, output_files) = write_batches(
+            &writer,
+            vec![
+                test_batch(0, 3),
+                test_batch(100, 2),
+                test_batch(200, 3),
+                test_batch(300, 1),
+            ],
+        );
+        assert_eq!(output_files.len(), 1);
+
+        let reader_builder =
+            ParquetRecordBatchReaderBuilder::try_new(File::open(&output_files[0]).unwrap())
+                .unwrap();
+        let row_group_sizes: Vec<i64> = reader_builder
+            .metadata()
+            .row_groups()
+            .iter()
+            .map(|row_group| row_group.num_rows())
+            .collect();
+        assert_eq!(row_group_sizes, vec![3, 2, 4]);
+    }
+}
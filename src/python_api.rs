@@ -79,24 +79,39 @@ impl MH160Device {
     }
 }
 
+// Recording runs for the whole measurement; release the GIL so other
+// Python threads are not blocked in the meantime.
+fn record_multiharp_to_parquet_without_gil(
+    py: Python<'_>,
+    device: Arc<dyn MH160 + Send + Sync>,
+    output_dir: PathBuf,
+    duration: Duration,
+    name: &str,
+) -> Result<()> {
+    let name = name.to_owned();
+    py.detach(|| wrapped_record_multiharp_to_parquet(device, output_dir, duration, name))
+}
+
 #[pyfunction]
 pub fn record_mh160stub_to_parquet(
+    py: Python<'_>,
     device: MH160Stub,
     output_dir: PathBuf,
     duration: Duration,
     name: &str,
 ) -> Result<()> {
-    wrapped_record_multiharp_to_parquet(device.wrapped, output_dir, duration, name.to_owned())
+    record_multiharp_to_parquet_without_gil(py, device.wrapped, output_dir, duration, name)
 }
 
 #[pyfunction]
 pub fn record_mh160device_to_parquet(
+    py: Python<'_>,
     device: MH160Device,
     output_dir: PathBuf,
     duration: Duration,
     name: &str,
 ) -> Result<()> {
-    wrapped_record_multiharp_to_parquet(device.wrapped, output_dir, duration, name.to_owned())
+    record_multiharp_to_parquet_without_gil(py, device.wrapped, output_dir, duration, name)
 }
 
 #[pymodule]
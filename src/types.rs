@@ -1,8 +1,49 @@
 //! Common, normalized types used to communicate across channels.
 
+#[derive(Clone, Copy, Debug, PartialEq, Eq)]
 pub struct NormalizedTimeTag {
+    /// The channel the event was seen on. Channel 0 is the sync channel; input channels are numbered from 1.
+    ///
+    /// Devices may number their channels differently. For example, MultiHarp raw records number input channels from 0 and flag sync events separately, so raw input channel N becomes channel N + 1 here.
     pub channel_id: u16,
 
     /// The time tag, in picoseconds, counting up from the start of the measurement.
     pub time_tag_ps: u64,
 }
+
+/// A batch of [`NormalizedTimeTag`]s, stored column-wise.
+///
+/// Normalizers send one batch for each batch of raw records they receive. Keeping each field in its own vector allows outputs to copy a whole column at once, for example into an Arrow array, rather than visiting every record.
+#[derive(Clone, Debug, Default, PartialEq, Eq)]
+pub struct NormalizedTimeTagBatch {
+    /// Channels, numbered as in [`NormalizedTimeTag::channel_id`]: 0 is the sync channel and input channels start from 1.
+    pub channel_ids: Vec<u16>,
+
+    /// Time tags, in picoseconds, counting up from the start of the measurement.
+    pub time_tags_ps: Vec<u64>,
+}
+
+impl NormalizedTimeTagBatch {
+    #[must_use]
+    pub fn with_capacity(capacity: usize) -> NormalizedTimeTagBatch {
+        NormalizedTimeTagBatch {
+            channel_ids: Vec::with_capacity(capacity),
+            time_tags_ps: Vec::with_capacity(capacity),
+        }
+    }
+
+    pub fn push(&mut self, time_tag: NormalizedTimeTag) {
+        self.channel_ids.push(time_tag.channel_id);
+        self.time_tags_ps.push(time_tag.time_tag_ps);
+    }
+
+    #[must_use]
+    pub fn len(&self) -> usize {
+        self.channel_ids.len()
+    }
+
+    #[must_use]
+    pub fn is_empty(&self) -> bool {
+        self.channel_ids.is_empty()
+    }
+}